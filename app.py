@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import plotly.express as px
 import random
-import openai
-from fpdf import FPDF
-import base64
+import asyncio
+import contextlib
+import os
+import tempfile
 
 st.set_page_config(page_title="Netflix Data Dashboard", page_icon="🎬", layout="wide")
 
@@ -37,16 +41,152 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ============ Load Data ============
-@st.cache_data
+DATA_URL = "https://drive.google.com/uc?id=1-C3O1uZDLsnYDVTppn0h3SjGOA4LifYE"
+# Bump the suffix whenever load_data() adds or changes a derived column
+PARQUET_CACHE = os.path.join(tempfile.gettempdir(), "netflix_v5.parquet")
+
+# Shared by reference across reruns and sessions; nothing below writes to df
+@st.cache_resource
 def load_data():
-    url = "https://drive.google.com/uc?id=1-C3O1uZDLsnYDVTppn0h3SjGOA4LifYE"
-    df = pd.read_csv(url)
-    df['date_added'] = pd.to_datetime(df['date_added'], errors='coerce')
-    df['year_added'] = df['date_added'].dt.year
-    df['duration_num'] = pd.to_numeric(df['duration'].str.extract(r'(\d+)')[0], errors='coerce')
+    # Reuse the parsed copy on disk so cold starts skip the Drive download and CSV parse
+    try:
+        return pd.read_parquet(PARQUET_CACHE)
+    except Exception:
+        pass  # missing or unreadable snapshot: rebuild it below
+    # All columns are kept: the charts use a few, but "Download CSV" exports the full rows
+    df = pd.read_csv(DATA_URL, engine='pyarrow',
+                     dtype={'type': 'category', 'rating': 'category', 'country': 'category'})
+    # Only the year is ever used, and it's the last four characters of "September 9, 2019"
+    df['year_added'] = pd.to_numeric(df['date_added'].str.strip().str[-4:], errors='coerce')
+    # Rows without a year fall outside every slider range, so drop them once and keep a plain int16
+    df = df.dropna(subset=['year_added']).reset_index(drop=True)
+    df['year_added'] = df['year_added'].astype('int16')
+    # Durations are always "<n> min" / "<n> Season(s)", so the leading token is the number
+    df['duration_num'] = pd.to_numeric(df['duration'].str.split(' ', n=1).str[0], errors='coerce').astype('Int16')
+    df['main_country'] = df['country'].str.split(',', n=1).str[0].str.strip().astype('category')
+    # Write next to the target and swap it in, so an interrupted write never leaves a truncated snapshot.
+    # The snapshot is only a speed-up: if the temp dir is full or read-only, serve the parsed frame anyway
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(PARQUET_CACHE), suffix='.parquet')
+        os.close(fd)
+        df.to_parquet(tmp_path, index=False, compression='zstd')
+        os.replace(tmp_path, PARQUET_CACHE)
+        tmp_path = None
+    except OSError:
+        pass
+    finally:
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
     return df
 
 df = load_data()
+TYPE_OPTIONS = df['type'].cat.categories.tolist()
+YEAR_MIN, YEAR_MAX = int(df['year_added'].min()), int(df['year_added'].max())
+
+# ============ Cached Aggregates ============
+# Keyed on (sorted types tuple, year range) so reruns that don't touch the filters reuse them;
+# bounded so a long-lived process doesn't keep one entry for every filter combination ever tried
+FILTER_CACHE_ENTRIES = 32
+CSV_CACHE_ENTRIES = 8  # each entry is a full CSV export, far larger than an aggregate or figure
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def filter_idx(types_key, yr):
+    # Compare raw category codes and int16 years
+    codes = df['type'].cat.categories.get_indexer(list(types_key))
+    years = df['year_added'].to_numpy()
+    mask = np.isin(df['type'].cat.codes.to_numpy(), codes[codes >= 0]) & (years >= yr[0]) & (years <= yr[1])
+    return np.flatnonzero(mask)
+
+def filter_df(types_key, yr):
+    return df.take(filter_idx(types_key, yr))
+
+@st.cache_data(max_entries=CSV_CACHE_ENTRIES)
+def filtered_csv(types_key, yr):
+    # Arrow's multithreaded C++ writer; categoricals are decoded so it gets plain string columns
+    # main_country only feeds the Durations chart; the export keeps the baseline's columns
+    rows = filter_df(types_key, yr).drop(columns='main_country')
+    table = pa.Table.from_pandas(rows, preserve_index=False)
+    table = pa.table({
+        name: col.cast(col.type.value_type) if pa.types.is_dictionary(col.type) else col
+        for name, col in zip(table.column_names, table.columns)
+    })
+    buf = pa.BufferOutputStream()
+    pa_csv.write_csv(table, buf)
+    return buf.getvalue().to_pybytes()
+
+@st.cache_data
+def year_type_counts():
+    # Whole-table year x type counts, built once; Overview, Titles Over Time and Trends slice it
+    return pd.crosstab(df['year_added'], df['type'])
+
+def year_type_slice(types_key, yr):
+    ct = year_type_counts()
+    return ct.loc[yr[0]:yr[1], ct.columns.isin(types_key)]
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def type_counts(types_key, yr):
+    counts = year_type_slice(types_key, yr).sum()
+    return counts[counts > 0]
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def year_counts(types_key, yr):
+    # One row per year instead of one per title
+    counts = year_type_slice(types_key, yr).sum(axis=1)
+    counts = counts[counts > 0]
+    return pd.DataFrame({'year_added': counts.index.to_numpy(dtype=np.int64), 'count': counts.to_numpy()})
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def rating_counts(types_key, yr):
+    return filter_df(types_key, yr).groupby(['rating', 'type'], observed=True).size().reset_index(name='count')
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def country_avg_duration(types_key, yr):
+    sub = filter_df(types_key, yr)
+    # Movies with a duration and a country, masked on raw codes and values
+    countries = sub['main_country'].cat.categories
+    codes = sub['main_country'].cat.codes.to_numpy()
+    dur = sub['duration_num'].to_numpy(dtype=float, na_value=np.nan)
+    is_movie = sub['type'].cat.codes.to_numpy() == sub['type'].cat.categories.get_loc('Movie')
+    keep = is_movie & ~np.isnan(dur) & (codes != -1)
+    # Group mean as two bincounts (sum and count) over the main_country category codes
+    sums = np.bincount(codes[keep], weights=dur[keep], minlength=len(countries))
+    n = np.bincount(codes[keep], minlength=len(countries))
+    seen = n > 0
+    return (
+        pd.DataFrame({'main_country': countries[seen], 'duration_num': sums[seen] / n[seen]})
+        .sort_values(by='duration_num', ascending=False)
+        .head(10)
+    )
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def trend_counts(types_key, yr):
+    ct = year_type_slice(types_key, yr)
+    ct = ct.loc[:, ct.sum() > 0]  # drop types with no titles in range
+    return ct.reset_index().melt(id_vars='year_added', var_name='type', value_name='count')
+
+# ============ Cached Figures ============
+# Figures are built once per filter key; reruns only re-send the cached figure
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def overview_fig(types_key, yr):
+    counts = type_counts(types_key, yr)
+    return px.bar(counts.rename_axis('type').reset_index(name='count'), x='type', y='count', color='type')
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def titles_fig(types_key, yr):
+    return px.bar(year_counts(types_key, yr), x='year_added', y='count', color_discrete_sequence=["#4a90e2"])
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def ratings_fig(types_key, yr):
+    return px.bar(rating_counts(types_key, yr), x='rating', y='count', color='type', barmode='group')
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def durations_fig(types_key, yr):
+    return px.bar(country_avg_duration(types_key, yr), x='main_country', y='duration_num', color='main_country')
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def trends_fig(types_key, yr):
+    return px.line(trend_counts(types_key, yr), x='year_added', y='count', color='type', markers=True, render_mode='webgl')
 
 # ============ Header ============
 st.markdown('<div class="animated-title">🎬 Netflix Data Dashboard - GPT Edition</div>', unsafe_allow_html=True)
@@ -67,40 +207,106 @@ With the power of OpenAI’s GPT, each view includes intelligent summaries that
 """)
 
 # ============ Sidebar ============
-st.sidebar.image("https://upload.wikimedia.org/wikipedia/commons/0/08/Netflix_2015_logo.svg", use_container_width=True)
-types = st.sidebar.multiselect("Select Type", df['type'].dropna().unique(), default=df['type'].dropna().unique())
-year_range = st.sidebar.slider("Select Year Range", int(df['year_added'].min()), int(df['year_added'].max()), (2015, 2020))
-df_filtered = df[(df['type'].isin(types)) & (df['year_added'].between(*year_range))]
-st.sidebar.download_button("📥 Download CSV", df_filtered.to_csv(index=False).encode(), "netflix_filtered.csv", "text/csv")
-st.sidebar.markdown("### 💡 Fun Fact")
-st.sidebar.info(random.choice([
+FACTS = (
     "Netflix started as a DVD rental company in 1997 💿",
     "'House of Cards' was its first original series 🃏",
-    "Over 100M households watched 'Squid Game' 🦑"
-]))
+    "Over 100M households watched 'Squid Game' 🦑",
+)
+
+st.sidebar.image("https://upload.wikimedia.org/wikipedia/commons/0/08/Netflix_2015_logo.svg", use_container_width=True)
+# Widgets inside a form only commit on "Apply", so dragging the slider doesn't rerun the pipeline
+with st.sidebar.form("filters"):
+    types = st.multiselect("Select Type", TYPE_OPTIONS, default=TYPE_OPTIONS)
+    year_range = st.slider("Select Year Range", YEAR_MIN, YEAR_MAX, (2015, 2020))
+    st.form_submit_button("Apply")
+filter_key = (tuple(sorted(types)), year_range)
+st.sidebar.download_button("📥 Download CSV", filtered_csv(*filter_key), "netflix_filtered.csv", "text/csv")
+st.sidebar.markdown("### 💡 Fun Fact")
+# Picked once per session so the fact doesn't change on every widget interaction
+st.session_state.setdefault("fact", random.choice(FACTS))
+st.sidebar.info(st.session_state["fact"])
 
 # ============ GPT Summary & PDF ============
-openai.api_key = st.secrets.get("OPENAI_API_KEY", None)
-
-def gpt_summary(df, tab):
-    prompt = f"Netflix data from {year_range[0]} to {year_range[1]} for {', '.join(types)}. "
-    prompt += {
-        "Overview": "Summarize the content types.",
-        "Ratings": "Summarize the rating breakdown.",
-        "Durations": (
-            "Based on filtered Netflix data, summarize the average movie durations by country. "
-            "Comment on which countries have the longest or shortest durations and any interesting trends."
-        ),
-        "Trends": "Summarize content trends over time.",
-        "Titles Over Time": "Summarize when titles were added."
-    }.get(tab, "Give a general summary.")
+OPENAI_API_KEY = st.secrets.get("OPENAI_API_KEY", None)
+
+@st.cache_resource
+def get_openai_client():
+    # One client per process keeps its HTTP connection pool alive between clicks
+    import openai  # deferred: only needed once someone asks for a summary
+    return openai.OpenAI(api_key=OPENAI_API_KEY)
+
+TAB_PROMPTS = {
+    "Overview": "Summarize the content types.",
+    "Ratings": "Summarize the rating breakdown.",
+    "Durations": (
+        "Based on filtered Netflix data, summarize the average movie durations by country. "
+        "Comment on which countries have the longest or shortest durations and any interesting trends."
+    ),
+    "Trends": "Summarize content trends over time.",
+    "Titles Over Time": "Summarize when titles were added."
+}
+
+# Short, low-temperature completions come back faster and cost fewer tokens
+GPT_PARAMS = {"model": "gpt-3.5-turbo", "max_tokens": 120, "temperature": 0.2}
+
+def build_prompt(tab, years, types_key):
+    # A pure function of hashable filter values, so it never needs the filtered DataFrame
+    prompt = f"Netflix data from {years[0]} to {years[1]} for {', '.join(types_key)}. "
+    return prompt + TAB_PROMPTS.get(tab, "Give a general summary.") + " Answer in at most 80 words."
+
+def gpt_summary(tab, years, types_key, status):
+    prompt = build_prompt(tab, years, types_key)
+    # Yield tokens as they arrive so st.write_stream can render them immediately;
+    # status["ok"] is only set once the stream has finished without an error
     try:
-        res = openai.ChatCompletion.create(model="gpt-3.5-turbo", messages=[{"role": "user", "content": prompt}])
-        return res.choices[0].message.content.strip()
+        stream = get_openai_client().chat.completions.create(
+            messages=[{"role": "user", "content": prompt}], stream=True, **GPT_PARAMS
+        )
+        for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+        status["ok"] = True
     except Exception as e:
-        return f"⚠️ GPT error: {e}"
+        yield f"⚠️ GPT error: {e}"
+
+async def gpt_summary_all(tabs, years, types_key):
+    # Fire all prompts at once so the wait is the slowest reply, not the sum of them
+    import openai
+
+    async def one(client, tab):
+        try:
+            res = await client.chat.completions.create(
+                messages=[{"role": "user", "content": build_prompt(tab, years, types_key)}], **GPT_PARAMS
+            )
+            return res.choices[0].message.content.strip(), True
+        except Exception as e:
+            return f"⚠️ GPT error: {e}", False
 
-def export_pdf(content, filename):
+    # The context manager closes the HTTP client before asyncio.run() tears the loop down;
+    # a failure building it (e.g. no API key) becomes the same error string for every tab
+    try:
+        async with openai.AsyncOpenAI(api_key=OPENAI_API_KEY) as client:
+            return await asyncio.gather(*(one(client, tab) for tab in tabs))
+    except Exception as e:
+        return [(f"⚠️ GPT error: {e}", False)] * len(tabs)
+
+def cached_summary(tab):
+    # Repeat clicks with unchanged filters reuse this session's earlier answer instead of calling the API
+    cache = st.session_state.setdefault("gpt_cache", {})
+    key = (tab, filter_key)
+    if key in cache:
+        # Same plain markdown st.write_stream renders, so a repeat click looks like the first
+        st.markdown(cache[key])
+        return cache[key]
+    status = {}
+    s = st.write_stream(gpt_summary(tab, year_range, filter_key[0], status))
+    # Only keep answers that streamed to the end; empty or failed ones are asked again next click
+    if s and status.get("ok"):
+        cache[key] = s
+    return s
+
+def export_pdf(content):
+    from fpdf import FPDF  # deferred: only needed after a summary is generated
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Helvetica", 'B', 16)
@@ -109,102 +315,100 @@ def export_pdf(content, filename):
     pdf.ln(10)
     for line in content.split('\n'):
         pdf.multi_cell(0, 10, line)
-    pdf.output(filename)
-    with open(filename, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode()
-    return f'<a href="data:application/pdf;base64,{b64}" download="{filename}">📄 Download PDF</a>'
+    # Build the PDF in memory: fpdf returns a latin-1 str, fpdf2 a bytearray
+    data = pdf.output(dest='S')
+    return data.encode('latin-1') if isinstance(data, str) else bytes(data)
 
 # ============ Tabs ============
+# Button key and PDF filename for each tab's GPT section
+TAB_CONFIG = {
+    "Overview": ("gpt1", "overview.pdf"),
+    "Titles Over Time": ("gpt2", "titles.pdf"),
+    "Ratings": ("gpt3", "ratings.pdf"),
+    "Durations": ("gpt4", "durations.pdf"),
+    "Trends": ("gpt5", "trends.pdf"),
+}
+
+# A fragment, so clicking one tab's GPT button reruns only that section, not the whole script
+@st.fragment
+def gpt_section(tab):
+    key, filename = TAB_CONFIG[tab]
+    if st.button("GPT Summary", key=key):
+        s = cached_summary(tab)
+        st.download_button("📄 Download PDF", export_pdf(s), filename, "application/pdf")
+
+if st.button("🧠 Summarize All Tabs"):
+    cache = st.session_state.setdefault("gpt_cache", {})
+    missing = [tab for tab in TAB_CONFIG if (tab, filter_key) not in cache]
+    with st.spinner("Asking GPT about every tab..."):
+        fresh = dict(zip(missing, asyncio.run(gpt_summary_all(missing, year_range, filter_key[0])))) if missing else {}
+    for tab in TAB_CONFIG:
+        if tab in fresh:
+            s, ok = fresh[tab]
+            if s and ok:
+                cache[(tab, filter_key)] = s
+        else:
+            s = cache[(tab, filter_key)]
+        st.success(f"**{tab}:** {s}")
+
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Overview", "📆 Titles Over Time", "🏷️ Ratings", "⏱️ Durations", "📈 Trends"])
 
 with tab1:
     st.subheader("📊 Content Type Overview")
-    fig = px.histogram(df_filtered, x='type', color='type')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(overview_fig(*filter_key), use_container_width=True, key="chart_overview")
 
-    counts = df_filtered['type'].value_counts(normalize=True).round(2) * 100
+    counts = type_counts(*filter_key)
+    counts = (counts / counts.sum()).round(2) * 100
     if not counts.empty:
         lines = [f"🔸 **{k}**: {v:.1f}%" for k, v in counts.items()]
         st.success("**Distribution of Selected Titles:**\n\n" + "\n".join(lines))
 
-    if st.button("GPT Summary", key="gpt1"):
-        s = gpt_summary(df_filtered, "Overview")
-        st.success(s)
-        st.markdown(export_pdf(s, "overview.pdf"), unsafe_allow_html=True)
+    gpt_section("Overview")
 
 with tab2:
     st.subheader("📆 Titles Over Time")
-    df_yr = df_filtered[df_filtered['year_added'].notnull()].copy()
-    df_yr['year_added'] = df_yr['year_added'].astype(int)
-    fig = px.histogram(df_yr, x='year_added', color_discrete_sequence=["#4a90e2"])
-    st.plotly_chart(fig, use_container_width=True)
-    if not df_yr.empty:
-        peak = df_yr['year_added'].value_counts().idxmax()
+    st.plotly_chart(titles_fig(*filter_key), use_container_width=True, key="chart_titles")
+    df_years = year_counts(*filter_key)
+    if not df_years.empty:
+        peak = df_years['year_added'].iat[df_years['count'].to_numpy().argmax()]
         st.success(f"📌 Most titles were added in **{peak}**.")
-    if st.button("GPT Summary", key="gpt2"):
-        s = gpt_summary(df_filtered, "Titles Over Time")
-        st.success(s)
-        st.markdown(export_pdf(s, "titles.pdf"), unsafe_allow_html=True)
+    gpt_section("Titles Over Time")
 
 with tab3:
     st.subheader("🏷️ Ratings by Type")
-    fig = px.histogram(df_filtered, x='rating', color='type', barmode='group')
-    st.plotly_chart(fig, use_container_width=True)
-    if not df_filtered.empty:
-        top_rating = df_filtered['rating'].value_counts().idxmax()
+    st.plotly_chart(ratings_fig(*filter_key), use_container_width=True, key="chart_ratings")
+    df_rating = rating_counts(*filter_key)
+    if not df_rating.empty:
+        ratings = df_rating['rating'].cat
+        top_rating = ratings.categories[np.bincount(ratings.codes, weights=df_rating['count']).argmax()]
         st.success(f"🏷️ The most frequent rating is **{top_rating}**.")
-    if st.button("GPT Summary", key="gpt3"):
-        s = gpt_summary(df_filtered, "Ratings")
-        st.success(s)
-        st.markdown(export_pdf(s, "ratings.pdf"), unsafe_allow_html=True)
+    gpt_section("Ratings")
 
 with tab4:
     st.subheader("⏱️ Average Movie Duration by Country")
+    df_avg = country_avg_duration(*filter_key)
 
-    df_movies = df_filtered[
-        (df_filtered['type'] == 'Movie') &
-        df_filtered['duration_num'].notna() &
-        df_filtered['country'].notna()
-    ].copy()
-
-    df_movies['main_country'] = df_movies['country'].str.split(',').str[0].str.strip()
-
-    if df_movies.empty:
+    if df_avg.empty:
         st.warning("⚠️ No movie data available for current filters.")
     else:
-        df_avg = (
-            df_movies.groupby('main_country')['duration_num']
-            .mean()
-            .reset_index()
-            .sort_values(by='duration_num', ascending=False)
-            .head(10)
-        )
-        fig = px.bar(df_avg, x='main_country', y='duration_num', color='main_country')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(durations_fig(*filter_key), use_container_width=True, key="chart_durations")
 
         max_country = df_avg.iloc[0]
         st.success(f"🏆 {max_country['main_country']} has the longest average: {round(max_country['duration_num'])} minutes")
 
-        if st.button("GPT Summary", key="gpt4"):
-            s = gpt_summary(df_filtered, "Durations")
-            st.success(s)
-            st.markdown(export_pdf(s, "durations.pdf"), unsafe_allow_html=True)
+        gpt_section("Durations")
 
 with tab5:
     st.subheader("📈 Content Growth Trends")
-    df_trend = df_filtered.groupby(['year_added', 'type']).size().reset_index(name='count')
-    fig = px.line(df_trend, x='year_added', y='count', color='type', markers=True)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(trends_fig(*filter_key), use_container_width=True, key="chart_trends")
+    df_trend = trend_counts(*filter_key)
 
     if not df_trend.empty:
         start = int(df_trend['year_added'].min())
         end = int(df_trend['year_added'].max())
         st.success(f"📈 This chart shows Netflix's content growth by type between **{start}** and **{end}**, highlighting how the platform evolved over time.")
 
-    if st.button("GPT Summary", key="gpt5"):
-        s = gpt_summary(df_filtered, "Trends")
-        st.success(s)
-        st.markdown(export_pdf(s, "trends.pdf"), unsafe_allow_html=True)
+    gpt_section("Trends")
 
 # ============ Footer ============
 st.markdown("---")